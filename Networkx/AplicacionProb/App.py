@@ -1,107 +1,216 @@
+import sys
+from functools import lru_cache
+
 import networkx as nx
-import matplotlib.pyplot as plt
+import numpy as np
+
+# Traducción de los bits del camino a caras: 0 = Cara, 1 = Sello
+CARAS = str.maketrans("01", "CS")
+
+# Por encima de este número de elementos se omiten etiquetas al dibujar
+# (cada etiqueta es un objeto Text de matplotlib y domina el tiempo de dibujo)
+MAX_ETIQUETAS = 64
+
+
+@lru_cache(maxsize=8)
+def enumerar_monedas(num_lanzamientos):
+    """
+    Enumera todos los nodos del árbol de monedas en arreglos de NumPy.
+    Los nodos se guardan por niveles: el nodo k tiene como hijos a 2k+1 (Cara)
+    y 2k+2 (Sello). Devuelve la probabilidad y el índice del padre de cada nodo.
+    Los arreglos se memorizan por número de lanzamientos y son de solo lectura.
+    """
+    total = (1 << (num_lanzamientos + 1)) - 1
+    probs = np.empty(total)
+    padres = np.full(total, -1, dtype=np.int64)
+    probs[0] = 1.0
+
+    # Cada nivel se calcula de forma vectorizada a partir del anterior
+    for nivel in range(1, num_lanzamientos + 1):
+        inicio = (1 << nivel) - 1
+        hijos = np.arange(inicio, 2 * inicio + 1)
+        padres[hijos] = (hijos - 1) // 2
+        probs[hijos] = 0.5 * probs[padres[hijos]]
+
+    # Compartidos por el grafo y las estadísticas: se protegen contra escritura
+    probs.flags.writeable = False
+    padres.flags.writeable = False
+    return probs, padres
+
+
+def resultados_monedas(num_lanzamientos):
+    """
+    Calcula los resultados finales (hojas) del árbol de monedas sin NetworkX.
+    Devuelve el camino de cada hoja (un bit por lanzamiento, 0 = Cara),
+    su probabilidad y su número de caras.
+    """
+    probs, _ = enumerar_monedas(num_lanzamientos)
+    num_hojas = 1 << num_lanzamientos
+    caminos = np.arange(num_hojas)
+
+    # Contar sellos (bits en 1) de forma vectorizada, un lanzamiento a la vez
+    sellos = np.zeros(num_hojas, dtype=int)
+    for bit in range(num_lanzamientos):
+        sellos += (caminos >> bit) & 1
+
+    return caminos, probs[-num_hojas:], num_lanzamientos - sellos
+
 
+def texto_camino(camino, num_lanzamientos):
+    """Convierte un camino (un bit por lanzamiento) en su resultado, p.ej. 'CS'."""
+    return bin(camino)[2:].zfill(num_lanzamientos).translate(CARAS)
 
+
+def id_moneda(nivel, camino):
+    """
+    Codifica un nodo del árbol de monedas como entero: el nivel en los bits
+    altos y el camino recorrido (un bit por lanzamiento) en los 32 bits bajos.
+    """
+    return (nivel << 32) | camino
+
+
+def texto_nodo(nodo):
+    """Devuelve el resultado que representa un nodo (p.ej. 'CS' o '3,4')."""
+    if isinstance(nodo, int):
+        # Nodo de moneda codificado como entero
+        nivel, camino = nodo >> 32, nodo & 0xFFFFFFFF
+        if nivel == 0:
+            return "Inicio"
+        return texto_camino(camino, nivel)
+    return nodo
+
+
+def etiqueta_arista(hijo):
+    """Etiqueta de la arista que llega a un nodo: resultado y su probabilidad."""
+    if isinstance(hijo, int):
+        # El último bit del camino indica el último lanzamiento de moneda
+        return f"{'CS'[hijo & 1]} (0.5)"
+    return f"{hijo.split(',')[-1]} (1/6)"
+
+
+@lru_cache(maxsize=8)
 def crear_arbol_monedas(num_lanzamientos):
     """
     Crea un árbol de probabilidades para lanzamientos de moneda usando DiGraph de NetworkX.
-    Cada nodo almacena su probabilidad y nivel como atributos.
+    Cada nodo (entero de id_moneda) almacena su probabilidad y nivel como atributos.
+    El grafo se memoriza por número de lanzamientos: no debe modificarse (usar G.copy()).
     """
     # Crear grafo dirigido (DiGraph) - representa flujo de probabilidad
-    G = nx.DiGraph()
-
-    def generar_nodos(nivel, resultado_actual, probabilidad_actual):
-        """Función recursiva que genera todos los caminos posibles"""
-        if nivel == num_lanzamientos:
-            return
-
-        # Rama: Cara
-        nuevo_resultado_cara = resultado_actual + "C"
-        nueva_prob_cara = probabilidad_actual * 0.5
-        # add_node: agregar nodo con atributos personalizados
-        G.add_node(nuevo_resultado_cara, prob=nueva_prob_cara, nivel=nivel + 1)
-        # add_edge: crear arista dirigida con etiqueta
-        G.add_edge(resultado_actual, nuevo_resultado_cara, label="C (0.5)")
-        generar_nodos(nivel + 1, nuevo_resultado_cara, nueva_prob_cara)
-
-        # Rama: Sello
-        nuevo_resultado_sello = resultado_actual + "S"
-        nueva_prob_sello = probabilidad_actual * 0.5
-        G.add_node(nuevo_resultado_sello, prob=nueva_prob_sello, nivel=nivel + 1)
-        G.add_edge(resultado_actual, nuevo_resultado_sello, label="S (0.5)")
-        generar_nodos(nivel + 1, nuevo_resultado_sello, nueva_prob_sello)
+    # Atributo de grafo 'altura': la profundidad se conoce al construirlo
+    G = nx.DiGraph(altura=num_lanzamientos)
 
     # Nodo raíz inicial
-    G.add_node("Inicio", prob=1.0, nivel=0)
-    generar_nodos(0, "Inicio", 1.0)
+    G.add_node(id_moneda(0, 0), prob=1.0, nivel=0)
+
+    # Las probabilidades se calculan con NumPy (memorizadas); el grafo solo las recoge
+    probs, padres = enumerar_monedas(num_lanzamientos)
+    probs, padres = probs.tolist(), padres.tolist()
+
+    # Construcción por niveles (BFS): cada nivel se inserta completo
+    ids = [id_moneda(0, 0)]
+    for nivel in range(1, num_lanzamientos + 1):
+        nodos = []
+        aristas = []
+        inicio = (1 << nivel) - 1
+        for k in range(inicio, 2 * inicio + 1):
+            padre = ids[padres[k]]
+            nuevo_resultado = id_moneda(nivel, k - inicio)
+            ids.append(nuevo_resultado)
+            nodos.append((nuevo_resultado, {'prob': probs[k], 'nivel': nivel}))
+            aristas.append((padre, nuevo_resultado))
+
+        # add_nodes_from / add_edges_from: inserción en bloque con atributos
+        G.add_nodes_from(nodos)
+        G.add_edges_from(aristas)
+
+    # El último nivel construido son las hojas (resultados finales)
+    G.graph['hojas'] = ids[-(1 << num_lanzamientos):]
 
     return G
 
 
+@lru_cache(maxsize=None)
 def crear_arbol_dado():
     """
     Crea árbol completo para dos lanzamientos de dado.
     Demuestra grafo con más ramificaciones (6 opciones por nivel).
+    El grafo se construye una sola vez y se reutiliza: no debe modificarse (usar G.copy()).
     """
-    G = nx.DiGraph()
-    G.add_node("Inicio", prob=1.0, nivel=0)
+    G = nx.DiGraph(altura=2)
 
     # Primer lanzamiento: 6 ramas
-    for i in range(1, 7):
-        nodo1 = f"{i}"
-        G.add_node(nodo1, prob=1 / 6, nivel=1)
-        G.add_edge("Inicio", nodo1, label=f"{i} (1/6)")
-
-        # Segundo lanzamiento: 6 ramas más por cada resultado del primero
-        for j in range(1, 7):
-            nodo2 = f"{i},{j}"
-            prob_final = (1 / 6) * (1 / 6)  # Probabilidad compuesta
-            G.add_node(nodo2, prob=prob_final, nivel=2, suma=i + j)  # Atributo extra: suma
-            G.add_edge(nodo1, nodo2, label=f"{j} (1/6)")
+    nodos = [("Inicio", {'prob': 1.0, 'nivel': 0})]
+    nodos += [(f"{i}", {'prob': 1 / 6, 'nivel': 1}) for i in range(1, 7)]
+    aristas = [("Inicio", f"{i}") for i in range(1, 7)]
+
+    # Segundo lanzamiento: 6 ramas más por cada resultado del primero
+    # meshgrid: las 36 parejas (i, j) de una vez, en el mismo orden que i, j anidados
+    I, J = np.meshgrid(np.arange(1, 7), np.arange(1, 7), indexing='ij')
+    parejas = np.stack([I.ravel(), J.ravel()], axis=1).tolist()
+    prob_final = (1 / 6) * (1 / 6)  # Probabilidad compuesta
+    nodos += [(f"{i},{j}", {'prob': prob_final, 'nivel': 2, 'suma': i + j})  # Atributo extra: suma
+              for i, j in parejas]
+    aristas += [(f"{i}", f"{i},{j}") for i, j in parejas]
+
+    # add_nodes_from / add_edges_from: inserción en bloque con atributos
+    G.add_nodes_from(nodos)
+    G.add_edges_from(aristas)
+
+    # Hojas: las 36 parejas del segundo lanzamiento
+    G.graph['hojas'] = [f"{i},{j}" for i, j in parejas]
 
     return G
 
 
-def visualizar_arbol(G, titulo, nombre_archivo):
+def visualizar_arbol(G, titulo, nombre_archivo, mostrar=True):
     """
     Visualiza el árbol usando múltiples funciones de NetworkX:
     - Posicionamiento manual por niveles
     - Coloreo condicional de nodos
     - Dibujo de nodos, aristas y etiquetas por separado
+    Con mostrar=False solo se guarda la imagen (sin plt.show()).
     """
-    plt.figure(figsize=(16, 10))
+    # matplotlib se importa solo al dibujar (su importación es costosa)
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(16, 10))
+
+    # Un solo recorrido de los nodos: atributos en arreglos paralelos de NumPy
+    nodos = list(G.nodes())
+    total = len(nodos)
+    # nodes(data=...): pares (nodo, atributo) en un solo recorrido, sin G.nodes[n][...]
+    niveles = np.fromiter((nivel for _, nivel in G.nodes(data='nivel')), dtype=int, count=total)
+    probs = np.fromiter((prob for _, prob in G.nodes(data='prob')), dtype=float, count=total)
+
+    # Hojas guardadas al construir el árbol; si no, un solo recorrido de out_degree()
+    if 'hojas' in G.graph:
+        hojas = set(G.graph['hojas'])
+    else:
+        hojas = {n for n, grado in G.out_degree() if grado == 0}
+    es_hoja = np.fromiter((n in hojas for n in nodos), dtype=bool, count=total)
 
     # Crear layout manual jerárquico (organizar por niveles)
     pos = {}
-    niveles = {}
-
-    # Agrupar nodos por nivel usando el atributo 'nivel'
-    for node in G.nodes():
-        nivel = G.nodes[node]['nivel']
-        if nivel not in niveles:
-            niveles[nivel] = []
-        niveles[nivel].append(node)
-
-    # Posicionar nodos espaciados horizontalmente por nivel
-    for nivel, nodos in niveles.items():
-        num_nodos = len(nodos)
-        for i, nodo in enumerate(nodos):
-            x = (i - num_nodos / 2) * 1.5  # Espaciado horizontal
-            y = -nivel * 2.5  # Espaciado vertical (niveles hacia abajo)
-            pos[nodo] = (x, y)
+    grupos = {}
+
+    # Agrupar nodos por nivel: nodes(data='nivel') entrega pares (nodo, nivel)
+    for node, nivel in G.nodes(data='nivel'):
+        grupos.setdefault(nivel, []).append(node)
+
+    # Posiciones x de cada nivel calculadas de una vez con NumPy
+    for nivel, grupo in grupos.items():
+        num_nodos = len(grupo)
+        xs = ((np.arange(num_nodos) - num_nodos / 2) * 1.5).tolist()  # Espaciado horizontal
+        y = -nivel * 2.5  # Espaciado vertical (niveles hacia abajo)
+        pos.update(zip(grupo, zip(xs, [y] * num_nodos)))
 
     # Colorear nodos según su posición en el árbol
-    node_colors = []
-    for node in G.nodes():
-        if node == "Inicio":
-            node_colors.append('lightgreen')  # Raíz: verde
-        elif G.out_degree(node) == 0:  # out_degree: nodos sin hijos (hojas)
-            node_colors.append('lightcoral')  # Hojas: rojo
-        else:
-            node_colors.append('lightblue')  # Intermedios: azul
+    # Raíz: verde, hojas: rojo, intermedios: azul
+    node_colors = np.select([niveles == 0, es_hoja],
+                            ['lightgreen', 'lightcoral'], 'lightblue').tolist()
 
     # Tamaños de nodos basados en probabilidad (atributo personalizado)
-    node_sizes = [G.nodes[node]['prob'] * 2000 + 500 for node in G.nodes()]
+    node_sizes = probs * 2000 + 500
 
     # draw_networkx_nodes: dibujar solo los nodos
     nx.draw_networkx_nodes(G, pos, node_color=node_colors,
@@ -113,29 +222,39 @@ def visualizar_arbol(G, titulo, nombre_archivo):
                            width=2, alpha=0.7, arrowstyle='->')
 
     # Crear etiquetas que muestren resultado y probabilidad
+    # En árboles grandes solo se etiquetan la raíz y las hojas
+    solo_extremos = total > MAX_ETIQUETAS
     labels = {}
-    for node in G.nodes():
-        if node == "Inicio":
+    for node, nivel, hoja, prob in zip(nodos, niveles.tolist(), es_hoja.tolist(), probs.tolist()):
+        if nivel == 0:
             labels[node] = "Inicio\nP=1.0"
-        else:
-            prob = G.nodes[node]['prob']
-            resultado = node.replace("Inicio", "")
-            labels[node] = f"{resultado}\nP={prob:.4f}"
+        elif not solo_extremos or hoja:
+            labels[node] = f"{texto_nodo(node)}\nP={prob:.4f}"
 
     # draw_networkx_labels: agregar etiquetas de texto a los nodos
     nx.draw_networkx_labels(G, pos, labels, font_size=7, font_weight='bold')
 
-    # get_edge_attributes: extraer atributos de aristas para etiquetarlas
-    edge_labels = nx.get_edge_attributes(G, 'label')
-    # draw_networkx_edge_labels: mostrar etiquetas en las aristas
-    nx.draw_networkx_edge_labels(G, pos, edge_labels, font_size=6, font_color='darkblue')
+    # Las etiquetas de aristas se derivan del nodo hijo (no se guardan en el grafo)
+    # y se omiten en árboles grandes
+    if G.number_of_edges() <= MAX_ETIQUETAS:
+        edge_labels = {(u, v): etiqueta_arista(v) for u, v in G.edges()}
+        # draw_networkx_edge_labels: mostrar etiquetas en las aristas
+        nx.draw_networkx_edge_labels(G, pos, edge_labels, font_size=6, font_color='darkblue')
+
+    # Límites calculados a partir de las posiciones (evita bbox_inches='tight',
+    # que obliga a renderizar dos veces al guardar)
+    xs, ys = np.array(list(pos.values())).T
+    plt.xlim(xs.min() - 1.0, xs.max() + 1.0)
+    plt.ylim(ys.min() - 1.0, ys.max() + 1.0)
 
     plt.title(titulo, fontsize=18, fontweight='bold', pad=25)
     plt.axis('off')
     plt.tight_layout()
-    plt.savefig(nombre_archivo, dpi=200, bbox_inches='tight', facecolor='white')
+    plt.savefig(nombre_archivo, dpi=100, facecolor='white')
     print(f"✓ Gráfico guardado: {nombre_archivo}")
-    plt.show()
+    if mostrar:
+        plt.show()
+    plt.close(fig)  # Liberar la memoria de la figura
 
 
 def analizar_grafo(G, tipo):
@@ -150,89 +269,103 @@ def analizar_grafo(G, tipo):
     # number_of_edges: contar aristas totales
     print(f"  • Aristas totales: {G.number_of_edges()}")
 
-    # Nodos hoja (sin descendientes): out_degree == 0
-    hojas = [n for n in G.nodes() if G.out_degree(n) == 0]
+    # Nodos hoja (sin descendientes): guardados al construir, o out_degree == 0
+    hojas = G.graph.get('hojas')
+    if hojas is None:
+        hojas = [n for n in G.nodes() if G.out_degree(n) == 0]
     print(f"  • Nodos hoja (resultados finales): {len(hojas)}")
 
 
-    # Altura del árbol (camino más largo desde raíz)
-    if nx.is_directed_acyclic_graph(G):
+    # Altura del árbol (camino más largo desde raíz), guardada al construirlo
+    altura = G.graph.get('altura')
+    if altura is None and nx.is_directed_acyclic_graph(G):
         # dag_longest_path_length: longitud del camino más largo en DAG
         altura = nx.dag_longest_path_length(G)
+    if altura is not None:
         print(f"  • Altura del árbol: {altura}")
 
     if tipo == "dado":
         # Análisis específico para dados: contar por suma
         print("\n DISTRIBUCIÓN DE SUMAS:")
-        sumas = {}
-        for node in hojas:
-            suma = G.nodes[node].get('suma', 0)
-            if suma not in sumas:
-                sumas[suma] = 0
-            sumas[suma] += 1
+        # bincount: histograma de sumas sin ramas por cada hoja
+        sumas = np.fromiter((G.nodes[n].get('suma', 0) for n in hojas), dtype=int, count=len(hojas))
+        conteos = np.bincount(sumas)
 
-        for suma in sorted(sumas.keys()):
-            prob = sumas[suma] / len(hojas)
-            print(f"  • Suma = {suma}: {sumas[suma]} formas, P = {prob:.4f}")
+        for suma in np.flatnonzero(conteos).tolist():
+            prob = conteos[suma] / len(hojas)
+            print(f"  • Suma = {suma}: {conteos[suma]} formas, P = {prob:.4f}")
 
 
 # --------------
 # MENÚ PRINCIPAL
 # --------------
-print("=" * 70)
-print("  ÁRBOLES DE PROBABILIDAD - NetworkX Demo")
-print("=" * 70)
-print("\n1. Lanzamiento de 2 monedas")
-print("2. Lanzamiento de 3 monedas")
-print("3. Lanzamiento de 2 dados")
-print("\n0. Salir")
-print("=" * 70)
-
-opcion = input("\nElige una opción (0-3): ")
-2
-if opcion == "1":
-    print("\n Generando árbol de 2 monedas...")
-    G = crear_arbol_monedas(2)
-    visualizar_arbol(G, "Árbol de Probabilidad - 2 Lanzamientos de Moneda",
-                     "arbol_2_monedas.png")
-    analizar_grafo(G, "moneda")
-
-    print("\n ESPACIO MUESTRAL:")
-    hojas = [n for n in G.nodes() if G.out_degree(n) == 0]
-    print(f"  Ω = {{{', '.join([h.replace('Inicio', '') for h in hojas])}}}")
-    print(f"  |Ω| = {len(hojas)} resultados ")
-
-elif opcion == "2":
-    print("\n Generando árbol de 3 monedas...")
-    G = crear_arbol_monedas(3)
-    visualizar_arbol(G, "Árbol de Probabilidad - 3 Lanzamientos de Moneda",
-                     "arbol_3_monedas.png")
-    analizar_grafo(G, "moneda")
-
-    print("\n DISTRIBUCIÓN DE CARAS:")
-    hojas = [n for n in G.nodes() if G.out_degree(n) == 0]
-    for num_caras in range(4):
-        resultados = [h for h in hojas if h.count('C') == num_caras]
-        prob = len(resultados) / len(hojas)
-        print(f"  • {num_caras} cara(s): {len(resultados)}/8 = {prob:.3f}")
-
-elif opcion == "3":
-    print("\n Generando árbol de 2 dados ")
-    G = crear_arbol_dado()
-    visualizar_arbol(G, "Árbol de Probabilidad - 2 Lanzamientos de Dado ",
-                     "arbol_dados_completo.png")
-    analizar_grafo(G, "dado")
-
-    print("\n🎲 PROBABILIDADES NOTABLES:")
-    print(f"  • P(suma = 7): 6/36 = 0.1667 (máximo)")
-    print(f"  • P(suma = 2 o 12): 1/36 cada uno = 0.0278 (mínimo)")
-    print(f"  • P(suma par): 18/36 = 0.5000")
-
-elif opcion == "0":
-    print("\n¡Hasta luego!")
-
-else:
-    print("\n Opción no válida")
-
-print("\n" + "=" * 70)
-
+def main():
+    """Menú principal de la demo."""
+    # Sin terminal (ejecución por lotes) se usa el backend Agg: solo se guarda el PNG
+    interactivo = sys.stdout.isatty()
+    if not interactivo:
+        import matplotlib
+        matplotlib.use('Agg')
+
+    print("=" * 70)
+    print("  ÁRBOLES DE PROBABILIDAD - NetworkX Demo")
+    print("=" * 70)
+    print("\n1. Lanzamiento de 2 monedas")
+    print("2. Lanzamiento de 3 monedas")
+    print("3. Lanzamiento de 2 dados")
+    print("\n0. Salir")
+    print("=" * 70)
+
+    opcion = input("\nElige una opción (0-3): ")
+
+    if opcion == "1":
+        print("\n Generando árbol de 2 monedas...")
+        G = crear_arbol_monedas(2)
+        visualizar_arbol(G, "Árbol de Probabilidad - 2 Lanzamientos de Moneda",
+                         "arbol_2_monedas.png", mostrar=interactivo)
+        analizar_grafo(G, "moneda")
+
+        print("\n ESPACIO MUESTRAL:")
+        caminos, _, _ = resultados_monedas(2)
+        print(f"  Ω = {{{', '.join([texto_camino(c, 2) for c in caminos.tolist()])}}}")
+        print(f"  |Ω| = {len(caminos)} resultados ")
+
+    elif opcion == "2":
+        print("\n Generando árbol de 3 monedas...")
+        G = crear_arbol_monedas(3)
+        visualizar_arbol(G, "Árbol de Probabilidad - 3 Lanzamientos de Moneda",
+                         "arbol_3_monedas.png", mostrar=interactivo)
+        analizar_grafo(G, "moneda")
+
+        print("\n DISTRIBUCIÓN DE CARAS:")
+        _, probs_hojas, caras = resultados_monedas(3)
+        # bincount con pesos: conteo y probabilidad de cada número de caras
+        conteos = np.bincount(caras, minlength=4)
+        probs_caras = np.bincount(caras, weights=probs_hojas, minlength=4)
+        for num_caras in range(4):
+            prob = probs_caras[num_caras]
+            print(f"  • {num_caras} cara(s): {conteos[num_caras]}/8 = {prob:.3f}")
+
+    elif opcion == "3":
+        print("\n Generando árbol de 2 dados ")
+        G = crear_arbol_dado()
+        visualizar_arbol(G, "Árbol de Probabilidad - 2 Lanzamientos de Dado ",
+                         "arbol_dados_completo.png", mostrar=interactivo)
+        analizar_grafo(G, "dado")
+
+        print("\n🎲 PROBABILIDADES NOTABLES:")
+        print(f"  • P(suma = 7): 6/36 = 0.1667 (máximo)")
+        print(f"  • P(suma = 2 o 12): 1/36 cada uno = 0.0278 (mínimo)")
+        print(f"  • P(suma par): 18/36 = 0.5000")
+
+    elif opcion == "0":
+        print("\n¡Hasta luego!")
+
+    else:
+        print("\n Opción no válida")
+
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()